@@ -1,10 +1,16 @@
+import asyncio
+import atexit
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any
+import time
+import orjson
+from collections import Counter, deque
+from datetime import datetime, timedelta, time as dt_time
+from typing import Dict, Any, Optional
 from pathlib import Path
 import logging
 from dataclasses import asdict
+from settings import Settings
 
 class AnalysisLogger:
     def __init__(self, base_dir: str = "analysis_logs"):
@@ -12,25 +18,81 @@ class AnalysisLogger:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
-        # Create dated directory for today's logs
-        self.today_dir = self.base_dir / datetime.now().strftime("%Y-%m-%d")
-        self.today_dir.mkdir(exist_ok=True)
-        
-        # Initialize analysis file for today
-        self.analysis_file = self.today_dir / "analysis.jsonl"
+        # Create dated directory and analysis file for today's logs
+        self._start_day()
         
         # Setup logging for debugging
         self.logger = logging.getLogger(__name__)
         
+        # Write-back buffer so several lines go out in a single write(); buffers
+        # are pre-sized and recycled through a small pool, filled up to _buf_len
+        self._pool: deque = deque(maxlen=Settings.ANALYSIS_LOG_SETTINGS.BUFFER_POOL_SIZE)
+        self._buf = self._take_buffer()
+        self._buf_len = 0
+        self._buf_count = 0
+        self._last_flush = time.monotonic()
+        self._fd = self._open(self.analysis_file)
+        atexit.register(self.close)
+        
+        # Background writer, started lazily from inside the running event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Items that found the queue full; the writer takes them after the
+        # queue, and nothing new enters the queue until they are drained.
+        # Past OVERFLOW_MAXSIZE the oldest held lines are dropped and counted,
+        # so a stalled disk costs log lines rather than unbounded memory
+        self._overflow: deque = deque()
+        self._overflow_lines = 0
+        self._dropped_lines = 0
+        
+        # Running daily summary, seeded from entries already logged today
+        self._summary = self._new_summary()
+        self._load_summary()
+        
+    def _start_day(self) -> None:
+        """Point the logger at today's directory and note when the day ends"""
+        now = datetime.now()
+        self.today_dir = self.base_dir / now.strftime("%Y-%m-%d")
+        self.today_dir.mkdir(exist_ok=True)
+        self.analysis_file = self.today_dir / "analysis.jsonl"
+        
+        # Epoch seconds of next local midnight; checking it is one float compare
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), dt_time.min)
+        self._next_rotation = next_midnight.timestamp()
+        
+    def _open(self, path: Path) -> int:
+        """Open an analysis file for appending"""
+        return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        
+    def _rotate(self) -> None:
+        """Close out the finished day and switch logging to the new one"""
+        stats = {'date': self.today_dir.name, 'summary': self.generate_daily_summary()}
+        self._save_day_stats(stats, self.today_dir)
+        self._summary = self._new_summary()
+        self._start_day()
+        
+        if self._writer_task is not None:
+            # The writer owns the file; it switches once earlier lines are out
+            self._put(self.analysis_file)
+        else:
+            self._reopen(self.analysis_file)
+        self.logger.info(f"Rotated analysis log to {self.analysis_file}")
+        
+    def _reopen(self, path: Path) -> None:
+        """Flush and close the current file, then start appending to path"""
+        self.flush()
+        if self._fd is not None:
+            os.fdatasync(self._fd)
+            os.close(self._fd)
+        self._fd = self._open(path)
+        
     def _format_timestamp(self) -> str:
         """Format current timestamp for logging"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         
     def _sanitize_for_json(self, obj: Any) -> Any:
-        """Sanitize objects for JSON serialization"""
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        elif hasattr(obj, 'to_dict'):
+        """Sanitize objects orjson cannot serialize natively"""
+        if hasattr(obj, 'to_dict'):
             return obj.to_dict()
         elif hasattr(obj, '__dict__'):
             return str(obj)
@@ -45,6 +107,9 @@ class AnalysisLogger:
                     context_summary: Dict = None) -> None:
         """Log complete analysis of a message and bot's response"""
         try:
+            if time.time() >= self._next_rotation:
+                self._rotate()
+                
             analysis_entry = {
                 "timestamp": self._format_timestamp(),
                 "chat_id": chat_id,
@@ -64,25 +129,237 @@ class AnalysisLogger:
                 "bot_response": bot_response
             }
             
-            # Sanitize the entry for JSON serialization
-            sanitized_entry = json.loads(
-                json.dumps(analysis_entry, default=self._sanitize_for_json)
+            # Serialize once; non-native types go through the sanitize hook
+            line = orjson.dumps(
+                analysis_entry,
+                default=self._sanitize_for_json,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
             )
             
-            # Append to today's analysis file
-            with open(self.analysis_file, 'a', encoding='utf-8') as f:
-                json.dump(sanitized_entry, f, ensure_ascii=False)
-                f.write('\n')
+            self._enqueue(line)
+            self._update_summary(analysis_entry)
                 
             self.logger.info(f"Logged analysis for message {message_obj.id}")
             
         except Exception as e:
             self.logger.error(f"Error logging analysis: {str(e)}")
             
-    def log_aggregate_stats(self, stats: Dict) -> None:
+    def _new_summary(self) -> Dict:
+        """Create empty running counters for the daily summary"""
+        return {
+            "total_messages": 0,
+            "responses_sent": 0,
+            "sentiment_distribution": Counter(positive=0, neutral=0, negative=0),
+            "decision_reasons": Counter(),
+            "most_common_keywords": Counter(),
+        }
+        
+    def _update_summary(self, entry: Dict) -> None:
+        """Fold one analysis entry into the running daily summary"""
+        summary = self._summary
+        summary["total_messages"] += 1
+        
+        if entry.get("bot_response"):
+            summary["responses_sent"] += 1
+        
+        # Categorize sentiment
+        sentiment = entry["sentiment_analysis"]["polarity"]
+        if sentiment > 0.1:
+            summary["sentiment_distribution"]["positive"] += 1
+        elif sentiment < -0.1:
+            summary["sentiment_distribution"]["negative"] += 1
+        else:
+            summary["sentiment_distribution"]["neutral"] += 1
+        
+        # Track decision reasons and keywords
+        summary["decision_reasons"][entry["decision_engine"]["decision_reason"]] += 1
+        summary["most_common_keywords"].update(entry["message"]["keywords"])
+        
+    def _load_summary(self) -> None:
+        """Replay today's existing log once so a restart keeps the day's counts"""
+        try:
+            # orjson parses bytes directly, so skip the text-mode decode
+            with open(self.analysis_file, 'rb') as f:
+                for line in f:
+                    try:
+                        self._update_summary(orjson.loads(line))
+                    except (orjson.JSONDecodeError, KeyError, TypeError):
+                        continue
+        except Exception as e:
+            self.logger.error(f"Error loading today's analysis summary: {str(e)}")
+            
+    def _enqueue(self, line: bytes) -> None:
+        """Hand a serialized line to the writer task, or buffer it inline"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. maintenance scripts): buffer synchronously
+            self._append(line)
+            if self._should_flush():
+                self.flush()
+            return
+            
+        if self._writer_task is None:
+            self._queue = asyncio.Queue(
+                maxsize=Settings.ANALYSIS_LOG_SETTINGS.QUEUE_MAXSIZE
+            )
+            self._writer_task = loop.create_task(self._writer_loop())
+            
+        self._put(line)
+        
+    def _put(self, item) -> None:
+        """Queue an item for the writer task without ever reordering items"""
+        if not self._overflow:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except asyncio.QueueFull:
+                self.logger.warning("Analysis log queue full, holding lines in order")
+                
+        if isinstance(item, bytes):
+            if self._overflow_lines >= Settings.ANALYSIS_LOG_SETTINGS.OVERFLOW_MAXSIZE:
+                self._drop_oldest_line()
+            self._overflow_lines += 1
+        self._overflow.append(item)
+        
+    def _drop_oldest_line(self) -> None:
+        """Discard the oldest held line; rotation and stop markers are kept"""
+        for index, held in enumerate(self._overflow):
+            if isinstance(held, bytes):
+                del self._overflow[index]
+                self._overflow_lines -= 1
+                self._dropped_lines += 1
+                return
+                
+    def _take_overflow(self):
+        """Pop the next held item, reporting any lines dropped once drained"""
+        item = self._overflow.popleft()
+        if isinstance(item, bytes):
+            self._overflow_lines -= 1
+        if not self._overflow and self._dropped_lines:
+            self.logger.error(f"Dropped {self._dropped_lines} analysis log lines "
+                              f"while the writer was behind")
+            self._dropped_lines = 0
+        return item
+            
+    async def _writer_loop(self) -> None:
+        """Drain queued lines into the buffer and flush it off the event loop"""
+        loop = asyncio.get_running_loop()
+        interval = Settings.ANALYSIS_LOG_SETTINGS.FLUSH_INTERVAL_SECONDS
+        stopping = False
+        
+        while not stopping:
+            try:
+                line = await asyncio.wait_for(self._queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                line = b''  # Timer tick, flush whatever has aged out
+                
+            # Handle everything already queued in this wake-up, so a burst
+            # costs one wait_for timer rather than one per line
+            while True:
+                if isinstance(line, Path):
+                    try:
+                        await loop.run_in_executor(None, self._reopen, line)
+                    except Exception as e:
+                        self.logger.error(f"Error rotating analysis log: {str(e)}")
+                elif line is None:
+                    stopping = True
+                elif line:
+                    self._append(line)
+                    
+                if self._buf_len and (stopping or self._should_flush()):
+                    try:
+                        await loop.run_in_executor(None, self.flush)
+                    except Exception as e:
+                        self.logger.error(f"Error writing analysis log: {str(e)}")
+                        
+                if stopping:
+                    break
+                try:
+                    line = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if not self._overflow:
+                        break
+                    line = self._take_overflow()
+                    
+    def _should_flush(self) -> bool:
+        """Check whether the write-back buffer has reached a flush threshold"""
+        limits = Settings.ANALYSIS_LOG_SETTINGS
+        return (
+            self._buf_count >= limits.FLUSH_MAX_ENTRIES or
+            self._buf_len >= limits.FLUSH_MAX_BYTES or
+            time.monotonic() - self._last_flush >= limits.FLUSH_INTERVAL_SECONDS
+        )
+        
+    def _take_buffer(self) -> bytearray:
+        """Reuse a pooled buffer, or allocate one sized for a full flush"""
+        if self._pool:
+            return self._pool.pop()
+        return bytearray(Settings.ANALYSIS_LOG_SETTINGS.FLUSH_MAX_BYTES)
+        
+    def _append(self, line: bytes) -> None:
+        """Copy a serialized line into the buffer at the fill cursor"""
+        end = self._buf_len + len(line)
+        # In place while it fits; past the end the slice assignment grows it
+        self._buf[self._buf_len:end] = line
+        self._buf_len = end
+        self._buf_count += 1
+        
+    def _write(self, data) -> None:
+        """Write a bytes-like object to the log file, retrying short writes"""
+        with memoryview(data) as view:
+            written = 0
+            while written < len(view):
+                written += os.write(self._fd, view[written:])
+                
+    def flush(self) -> None:
+        """Write all buffered analysis lines to today's file"""
+        if self._buf_len:
+            buf, length = self._buf, self._buf_len
+            self._buf = self._take_buffer()
+            self._buf_len = 0
+            self._buf_count = 0
+            with memoryview(buf) as view:
+                self._write(view[:length])
+            self._pool.append(buf)
+        self._last_flush = time.monotonic()
+        
+    def close(self) -> None:
+        """Flush pending lines, sync them to disk and close the file"""
+        if self._fd is None:
+            return
+        try:
+            self.flush()
+            os.fdatasync(self._fd)
+        except Exception as e:
+            self.logger.error(f"Error flushing analysis log: {str(e)}")
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            
+    async def aclose(self) -> None:
+        """Drain the writer task, then flush and close the log file"""
+        if self._writer_task is not None:
+            self._put(None)
+            await self._writer_task
+            self._writer_task = None
+            self._queue = None
+        self.close()
+        
+    def _save_day_stats(self, stats: Dict, day_dir: Path) -> None:
+        """Merge a closing day's stats into its file, off the loop when one runs"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.log_aggregate_stats(stats, day_dir)
+            return
+        # Read-merge-write of the stats file is plain file I/O
+        loop.run_in_executor(None, self.log_aggregate_stats, stats, day_dir)
+        
+    def log_aggregate_stats(self, stats: Dict, day_dir: Optional[Path] = None) -> None:
         """Log aggregate statistics for the day"""
         try:
-            stats_file = self.today_dir / "daily_stats.json"
+            stats_file = (day_dir or self.today_dir) / "daily_stats.json"
             
             # Update existing stats if file exists
             if stats_file.exists():
@@ -99,54 +376,19 @@ class AnalysisLogger:
             self.logger.error(f"Error logging daily stats: {str(e)}")
             
     def generate_daily_summary(self) -> Dict:
-        """Generate summary of today's analysis"""
+        """Generate summary of today's analysis from the running counters"""
         try:
-            if not self.analysis_file.exists():
-                return {"error": "No analysis file found for today"}
-                
             summary = {
-                "total_messages": 0,
-                "responses_sent": 0,
-                "sentiment_distribution": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                },
-                "decision_reasons": {},
-                "most_common_keywords": {},
+                key: dict(value) if isinstance(value, Counter) else value
+                for key, value in self._summary.items()
             }
             
-            with open(self.analysis_file, 'r') as f:
-                for line in f:
-                    entry = json.loads(line)
-                    summary["total_messages"] += 1
-                    
-                    if entry.get("bot_response"):
-                        summary["responses_sent"] += 1
-                    
-                    # Categorize sentiment
-                    sentiment = entry["sentiment_analysis"]["polarity"]
-                    if sentiment > 0.1:
-                        summary["sentiment_distribution"]["positive"] += 1
-                    elif sentiment < -0.1:
-                        summary["sentiment_distribution"]["negative"] += 1
-                    else:
-                        summary["sentiment_distribution"]["neutral"] += 1
-                    
-                    # Track decision reasons
-                    reason = entry["decision_engine"]["decision_reason"]
-                    summary["decision_reasons"][reason] = summary["decision_reasons"].get(reason, 0) + 1
-                    
-                    # Track keywords
-                    for keyword in entry["message"]["keywords"]:
-                        summary["most_common_keywords"][keyword] = summary["most_common_keywords"].get(keyword, 0) + 1
-            
             # Save summary
-            with open(self.today_dir / "daily_summary.json", 'w') as f:
-                json.dump(summary, f, indent=2)
+            with open(self.today_dir / "daily_summary.json", 'wb') as f:
+                f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
                 
             return summary
             
         except Exception as e:
             self.logger.error(f"Error generating daily summary: {str(e)}")
-            return {"error": str(e)}
+            return {"error": str(e)}
\ No newline at end of file
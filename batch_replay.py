@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import io
+import logging
+import random
+import argparse
+import asyncio
+import orjson
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Import local modules
+from settings import Settings, write_env_cache
+from openai_client import get_openai_client, close_openai_client
+
+# Setup logging
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Batch status polling: batches take minutes to hours, so back off to a minute
+POLL_INITIAL_DELAY = 5.0
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_DELAY = 60.0
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Per-batch input limits; bigger replays are split across several batches
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+FINISHED_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+class BatchReplayer:
+    """Replay a day's logged messages through the Batch API
+
+    Offline replays do not need interactive latency, so they go through
+    batches (cheaper, and on a separate quota) instead of the Assistants
+    API the live bot uses. Batches cannot run assistant threads, so each
+    message becomes a standalone chat completion using the assistant's
+    own model and instructions.
+    """
+
+    def __init__(self, logs_dir: str = "analysis_logs"):
+        """Initialize the replayer with the shared OpenAI client"""
+        try:
+            self.client = get_openai_client()
+            self.logs_dir = Path(logs_dir)
+            logger.info("BatchReplayer initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize BatchReplayer: {str(e)}")
+            raise
+
+    def load_messages(self, day: str) -> List[Dict]:
+        """Read the messages logged for a day"""
+        messages = []
+        day_log = self.logs_dir / day / "analysis.jsonl"
+        with open(day_log, 'rb') as f:
+            for line in f:
+                try:
+                    entry = orjson.loads(line)
+                    message = entry['message']
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    continue
+                if message.get('content'):
+                    messages.append({'chat_id': entry.get('chat_id'), **message})
+        logger.info(f"Loaded {len(messages)} messages from {day_log}")
+        return messages
+
+    def build_requests(self, messages: List[Dict], model: str,
+                       instructions: Optional[str]) -> List[bytes]:
+        """Serialize one chat completion request per message as batch JSONL
+
+        Returns one payload per batch, each within BATCH_MAX_REQUESTS lines
+        and BATCH_MAX_BYTES.
+        """
+        system = [{"role": "system", "content": instructions}] if instructions else []
+        payloads = []
+        buf = io.BytesIO()
+        count = 0
+        for index, message in enumerate(messages):
+            line = orjson.dumps({
+                "custom_id": f"{message['chat_id']}-{message['id']}-{index}",
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": system + [{"role": "user", "content": message['content']}],
+                },
+            }, option=orjson.OPT_APPEND_NEWLINE)
+            if len(line) > BATCH_MAX_BYTES:
+                raise ValueError(f"Request for message {message['id']} exceeds "
+                                 f"the {BATCH_MAX_BYTES} byte batch input limit")
+            if count == BATCH_MAX_REQUESTS or buf.tell() + len(line) > BATCH_MAX_BYTES:
+                payloads.append(buf.getvalue())
+                buf = io.BytesIO()
+                count = 0
+            buf.write(line)
+            count += 1
+        if count:
+            payloads.append(buf.getvalue())
+        return payloads
+
+    async def submit(self, day: str) -> List[str]:
+        """Upload a day's requests and start its batches; returns the batch ids"""
+        messages = self.load_messages(day)
+        if not messages:
+            return []
+
+        assistant = await self.client.beta.assistants.retrieve(Settings.ASSISTANT_ID)
+        payloads = self.build_requests(messages, assistant.model, assistant.instructions)
+
+        batch_ids = []
+        for part, payload in enumerate(payloads, start=1):
+            batch_file = await self.client.files.create(
+                file=(f"replay_{day}_{part}.jsonl", payload),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window="24h",
+                metadata={"source": "analysis_replay", "day": day,
+                          "part": f"{part}/{len(payloads)}"}
+            )
+            requests = payload.count(b'\n')
+            logger.info(f"Submitted batch {batch.id} ({part}/{len(payloads)}) "
+                        f"with {requests} requests")
+            batch_ids.append(batch.id)
+        return batch_ids
+
+    async def wait(self, batch_id: str):
+        """Poll a batch with exponential backoff until it finishes"""
+        delay = POLL_INITIAL_DELAY
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status in FINISHED_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            logger.info(f"Batch {batch_id} is {batch.status}, checking again in {delay:.0f}s")
+            await asyncio.sleep(delay + random.uniform(0, 1))
+            delay = min(delay * POLL_BACKOFF_FACTOR, POLL_MAX_DELAY)
+
+    async def download(self, batch, day: str) -> Optional[Path]:
+        """Save a finished batch's output next to the day's analysis log"""
+        if not batch.output_file_id:
+            logger.error(f"Batch {batch.id} has no output file")
+            return None
+        content = await self.client.files.content(batch.output_file_id)
+        output = self.logs_dir / day / f"batch_replay_{batch.id}.jsonl"
+        output.write_bytes(content.read())
+        logger.info(f"Saved batch results to {output}")
+        return output
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay logged messages through the Batch API")
+    parser.add_argument('--day', default=datetime.now().strftime("%Y-%m-%d"),
+                        help="analysis_logs day directory to replay (YYYY-MM-DD)")
+    parser.add_argument('--batch-id', nargs='+',
+                        help="resume waiting on already submitted batches")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="submit and exit without waiting for results")
+    args = parser.parse_args()
+
+    try:
+        Settings.validate_env_vars(Settings.OPENAI_ENV_VARS)
+        write_env_cache()
+        replayer = BatchReplayer()
+        batch_ids = args.batch_id or await replayer.submit(args.day)
+        if not batch_ids:
+            print(f"\nNo messages logged for {args.day}")
+            return
+
+        print(f"\nBatch IDs: {' '.join(batch_ids)}")
+        if args.no_wait:
+            print(f"Resume later with: python batch_replay.py --day {args.day} "
+                  f"--batch-id {' '.join(batch_ids)}")
+            return
+
+        for batch_id in batch_ids:
+            batch = await replayer.wait(batch_id)
+            output = await replayer.download(batch, args.day)
+            if output:
+                print(f"Results written to {output}")
+    except Exception as e:
+        logger.error(f"Error in main: {str(e)}")
+        print(f"\nError: {str(e)}")
+    finally:
+        await close_openai_client()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
-from collections import deque
+import time
+from collections import Counter, deque
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
 from message import Message
@@ -7,62 +8,76 @@ from settings import Settings
 class ContextTracker:
     def __init__(self):
         # Use deque with maxlen for automatic size management
-        self.messages = deque(maxlen=Settings.CONTEXT_SETTINGS['MAX_CONTEXT_MESSAGES'])
+        self.messages = deque(maxlen=Settings.CONTEXT_SETTINGS.MAX_CONTEXT_MESSAGES)
+        # Parallel to self.messages: POSIX timestamps, so eviction only scans floats
+        self._timestamps = deque(maxlen=Settings.CONTEXT_SETTINGS.MAX_CONTEXT_MESSAGES)
         self.current_context: Optional[str] = None
+        self.last_message_time: Optional[float] = None  # time.monotonic()
         self.context_start_time = datetime.now()
-        self.topic_frequency: Dict[str, int] = {}
+        self.topic_frequency: Counter = Counter()
+        self.context_timeframe = timedelta(
+            minutes=Settings.CONTEXT_SETTINGS.CONTEXT_TIMEFRAME_MINUTES
+        )
     
-    def add_message(self, message: Message):
+    def add_message(self, message: Message, now: Optional[datetime] = None):
         """Add message to context and update tracking"""
+        now = now or datetime.now()
+        self.last_message_time = time.monotonic()
+        
+        # A full deque silently drops its oldest entry, so forget its topics first
+        if len(self.messages) == self.messages.maxlen:
+            self._forget_message(self.messages[0])
         self.messages.append(message)
-        self._clean_old_messages()
-        self._update_context()
+        self._timestamps.append(message.timestamp.timestamp())
+        # Count before cleaning so an already-stale message is also uncounted
         self._update_topic_frequency(message)
+        self._clean_old_messages(now)
+        self._update_context(now)
     
-    def _clean_old_messages(self):
+    def _clean_old_messages(self, now: datetime):
         """Remove messages older than the context timeframe"""
-        cutoff_time = datetime.now() - timedelta(
-            minutes=Settings.CONTEXT_SETTINGS['CONTEXT_TIMEFRAME_MINUTES']
-        )
+        cutoff_time = now.timestamp() - self.context_timeframe.total_seconds()
         
-        # Remove old messages from the front of the deque
-        while self.messages and self.messages[0].timestamp < cutoff_time:
-            self.messages.popleft()
+        # Remove old messages from the front of both deques
+        timestamps = self._timestamps
+        while timestamps and timestamps[0] < cutoff_time:
+            timestamps.popleft()
+            self._forget_message(self.messages.popleft())
+    
+    def _forget_message(self, message: Message):
+        """Remove an evicted message's keywords from the topic frequency"""
+        for keyword in message.keywords:
+            count = self.topic_frequency[keyword] - 1
+            if count > 0:
+                self.topic_frequency[keyword] = count
+            else:
+                self.topic_frequency.pop(keyword, None)
     
     def _update_topic_frequency(self, message: Message):
         """Update the frequency count of topics/keywords"""
         if message.keywords:
-            for keyword in message.keywords:
-                self.topic_frequency[keyword] = self.topic_frequency.get(keyword, 0) + 1
+            self.topic_frequency.update(message.keywords)
     
-    def _update_context(self):
+    def _update_context(self, now: datetime):
         """Update current context based on recent messages"""
-        if len(self.messages) < Settings.CONTEXT_SETTINGS['MIN_MESSAGES_FOR_TREND']:
+        if len(self.messages) < Settings.CONTEXT_SETTINGS.MIN_MESSAGES_FOR_TREND:
             return
         
-        # Reset topic frequency if context is too old
-        if (datetime.now() - self.context_start_time).total_seconds() > \
-           Settings.CONTEXT_SETTINGS['CONTEXT_TIMEFRAME_MINUTES'] * 60:
-            self.topic_frequency.clear()
-            self.context_start_time = datetime.now()
+        # Roll the context window over once it is too old; topic counts
+        # already track only the messages still inside the window
+        if now - self.context_start_time > self.context_timeframe:
+            self.context_start_time = now
         
         # Find most common topic
         if self.topic_frequency:
-            self.current_context = max(
-                self.topic_frequency.items(),
-                key=lambda x: x[1]
-            )[0]
+            self.current_context = self.topic_frequency.most_common(1)[0][0]
     
     def get_context_summary(self) -> Dict:
         """Get summary of current context"""
         return {
             'current_context': self.current_context,
             'message_count': len(self.messages),
-            'top_topics': sorted(
-                self.topic_frequency.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5],
+            'top_topics': self.topic_frequency.most_common(5),
             'context_age_minutes': (
                 datetime.now() - self.context_start_time
             ).total_seconds() / 60
@@ -1,10 +1,11 @@
 from typing import Optional, Dict, Set, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime
 import random
 import re
+import time
 import logging
 import traceback
-from message import Message
+from message import Message, MessageFeatures
 from sentiment_analyzer import SentimentAnalyzer
 from keyword_detector import KeywordDetector
 from context_tracker import ContextTracker
@@ -13,7 +14,7 @@ from settings import Settings
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+    level=Settings.LOG_LEVEL
 )
 logger = logging.getLogger(__name__)
 
@@ -23,92 +24,77 @@ class DecisionEngine:
             self.sentiment_analyzer = SentimentAnalyzer()
             self.keyword_detector = KeywordDetector()
             self.context_tracker = ContextTracker()
-            self.last_response_time: Optional[datetime] = None
+            self.last_response_time: Optional[float] = None  # time.monotonic()
             self.project_terms = Settings.PROJECT_TERMS
+            self._question_indicators = Settings.QUESTION_INDICATORS
+            # Single letter-bounded alternation so all project terms are found
+            # in one scan without matching inside unrelated words ("alphabet");
+            # unlike \b, '_' and digits separate, so "@gigacheng_bot" still matches
+            self._project_re = re.compile(r'(?<![a-z])(?:' + '|'.join(
+                re.escape(term)
+                for term in sorted(self.project_terms, key=len, reverse=True)
+            ) + r')(?![a-z])')
             self.bot_name = "GIGACHENG"
             logger.info("DecisionEngine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize DecisionEngine: {str(e)}")
             raise
 
-    def _is_negative_about_projects(self, message: Message) -> bool:
-        """Check if message is negative about project terms"""
-        try:
-            text_lower = message.content.lower()
-            words = text_lower.split()
-            
-            # Check for project mention
-            has_project_mention = any(term in text_lower for term in self.project_terms)
-            
-            if has_project_mention and message.sentiment_score < Settings.SENTIMENT_THRESHOLD_ALERT:
-                return True
-                
-            return False
-        except Exception as e:
-            logger.error(f"Error in negative sentiment detection: {str(e)}")
-            return False
+    def _has_project_mention(self, message: Message) -> bool:
+        """Check if message mentions any project term"""
+        return self._project_re.search(message.content_lower) is not None
 
-    def _is_question_about_project(self, message: Message) -> bool:
-        """Check if message contains question about project"""
-        try:
-            text_lower = message.content.lower()
-            words = text_lower.split()
-            
-            # Check for project mention
-            has_project_mention = any(term in text_lower for term in self.project_terms)
-            
-            if not has_project_mention:
-                return False
-            
-            # Check for question indicators
-            if ('?' in message.content or 
-                any(word in Settings.QUESTION_INDICATORS for word in words)):
-                return True
-                
-            return False
-        except Exception as e:
-            logger.error(f"Error in question detection: {str(e)}")
-            return False
+    def _is_question(self, message: Message) -> bool:
+        """Check if message reads as a question"""
+        return ('?' in message.content or
+                not message.words.isdisjoint(self._question_indicators))
+
+    def _analyze_once(self, message: Message) -> MessageFeatures:
+        """Run every detector over the message's shared lowercase text and word set"""
+        return MessageFeatures(
+            sentiment=self.sentiment_analyzer.analyze(message),
+            keywords=self.keyword_detector.detect_keywords(message),
+            has_project_mention=self._has_project_mention(message),
+            is_question=self._is_question(message)
+        )
 
-    def _should_respond(self, message: Message, is_reply_to_bot: bool = False) -> Tuple[bool, str]:
+    def _should_respond(self, message: Message, features: MessageFeatures,
+                        is_reply_to_bot: bool = False) -> Tuple[bool, str]:
         """Determine if bot should respond to message"""
         try:
-            # Check rate limiting
-            if self.last_response_time:
-                time_since_last = (datetime.now() - self.last_response_time).seconds
-                if time_since_last < Settings.RATE_LIMITS['MIN_RESPONSE_INTERVAL']:
-                    logger.info(f"Rate limited: {time_since_last}s since last response")
-                    return False, "Rate limited"
+            # Rate limiting is per chat, in ResponseHandler's token buckets, and
+            # runs before analysis; a global gate here would cap every chat at
+            # one response per MIN_RESPONSE_INTERVAL and void RESPONSE_BURST
             
             # Check project mentions (highest priority)
-            if any(term in message.content.lower() for term in self.project_terms):
-                logger.info("Responding to project mention")
+            if features.has_project_mention:
+                logger.debug("Responding to project mention")
                 return True, "Project mention"
             
             # Check sentiment thresholds
             if message.sentiment_score <= Settings.SENTIMENT_THRESHOLD_ALERT:
-                logger.info(f"Responding to negative sentiment: {message.sentiment_score}")
+                logger.debug("Responding to negative sentiment: %s", message.sentiment_score)
                 return True, "Negative sentiment"
             elif message.sentiment_score >= Settings.SENTIMENT_THRESHOLD_RESPONSE:
-                logger.info(f"Responding to positive sentiment: {message.sentiment_score}")
+                logger.debug("Responding to positive sentiment: %s", message.sentiment_score)
                 return True, "Positive sentiment"
             
             # Check for project questions
-            if self._is_question_about_project(message):
-                logger.info("Responding to project question")
+            if features.has_project_mention and features.is_question:
+                logger.debug("Responding to project question")
                 return True, "Project question"
             
             # Check for technical keywords with significant sentiment
             if message.keywords and abs(message.sentiment_score) > 0.3:
-                logger.info("Responding to technical discussion with sentiment")
+                logger.debug("Responding to technical discussion with sentiment")
                 return True, "Technical discussion"
             
             # Random engagement with lower probability
-            if random.random() < Settings.RATE_LIMITS['RANDOM_RESPONSE_PROBABILITY']:
-                logger.info("Random response triggered")
+            if random.random() < Settings.RATE_LIMITS.RANDOM_RESPONSE_PROBABILITY:
+                logger.debug("Random response triggered")
                 return True, "Random engagement"
             
-            logger.info("No response triggers met")
+            logger.debug("No response triggers met")
             return False, "No triggers met"
             
         except Exception as e:
@@ -129,31 +115,38 @@ class DecisionEngine:
         }
         
         try:
-            logger.info(f"Processing message: {message.content[:50]}...")
+            logger.debug("Processing message: %.50s...", message.content)
             
-            # Analyze sentiment
-            sentiment = self.sentiment_analyzer.analyze(message)
+            # Analyze the message in one go; helpers below reuse the features
+            features = self._analyze_once(message)
+            
+            # Apply sentiment
+            sentiment = features.sentiment
+            message.sentiment_details = sentiment
             message.sentiment_score = sentiment['polarity']
             message.sentiment_subjectivity = sentiment['subjectivity']
             debug_info['sentiment_score'] = message.sentiment_score
             debug_info['sentiment_subjectivity'] = message.sentiment_subjectivity
             
-            # Detect keywords
-            keywords = self.keyword_detector.detect_keywords(message)
-            message.keywords = list(keywords)
+            # Apply keywords
+            keywords = features.keywords
+            message.keywords = keywords
             debug_info['has_keywords'] = bool(keywords)
-            debug_info['keywords'] = list(keywords)
+            debug_info['keywords'] = keywords
             
-            # Update context
-            self.context_tracker.add_message(message)
+            # Update context, sharing one timestamp for the whole message
+            now = datetime.now()
+            self.context_tracker.add_message(message, now)
             
             # Make response decision
-            should_respond, reason = self._should_respond(message, is_reply_to_bot)
+            should_respond, reason = self._should_respond(
+                message, features, is_reply_to_bot
+            )
             debug_info['should_respond'] = should_respond
             debug_info['decision_reason'] = reason
             
             if should_respond:
-                self.last_response_time = datetime.now()
+                self.last_response_time = time.monotonic()
             
             return should_respond, debug_info
             
@@ -164,20 +157,12 @@ class DecisionEngine:
         
     def should_generate_spontaneous_message(self) -> bool:
         """Check if bot should generate spontaneous message"""
-        try:
-            if not self.last_response_time:
-                return True
-            
-            time_since_last_message = (
-                datetime.now() - self.context_tracker.messages[-1].timestamp
-                if self.context_tracker.messages
-                else timedelta(hours=1)
-            )
-                
-            return time_since_last_message > timedelta(
-                minutes=Settings.CONTEXT_SETTINGS['DEAD_CHAT_MINUTES']
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in spontaneous message check: {str(e)}")
-            return False
\ No newline at end of file
+        if self.last_response_time is None:
+            return True
+        
+        last_message_time = self.context_tracker.last_message_time
+        if last_message_time is None:
+            return True
+        
+        return (time.monotonic() - last_message_time >
+                Settings.CONTEXT_SETTINGS.DEAD_CHAT_MINUTES * 60)
\ No newline at end of file
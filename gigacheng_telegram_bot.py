@@ -1,32 +1,36 @@
 # gigacheng_telegram_bot.py
 from telegram import Update
 from telegram.ext import Application, MessageHandler, CommandHandler, filters
-from openai import OpenAI
+import asyncio
 import logging
 from datetime import datetime
-from dotenv import load_dotenv
 from message import Message
-from settings import Settings
+from settings import Settings, write_env_cache
 from decision_engine import DecisionEngine
 from analysis_logger import AnalysisLogger
 from response_handler import ResponseHandler
 from message_processor import MessageProcessor
+from openai_client import get_openai_client, close_openai_client
 
 # Setup logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+    level=Settings.LOG_LEVEL
 )
 logger = logging.getLogger(__name__)
 
+# Prefer the libuv event loop when available; run_polling picks up the policy
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 class GigaChengGroupBot:
     def __init__(self):
         try:
-            # Initialize OpenAI client with v2 API configuration
-            self.client = OpenAI(
-                api_key=Settings.OPENAI_API_KEY,
-                default_headers={"OpenAI-Beta": "assistants=v2"}
-            )
+            # Shared async OpenAI client with v2 API configuration
+            self.client = get_openai_client()
             
             # Initialize components
             self.decision_engine = DecisionEngine()
@@ -39,18 +43,15 @@ class GigaChengGroupBot:
                 self.analysis_logger
             )
             
-            # Check assistant configuration
-            self._check_assistant_config()
-            
             logger.info("Bot initialized successfully with v2 API")
         except Exception as e:
             logger.error(f"Failed to initialize bot: {str(e)}")
             raise
 
-    def _check_assistant_config(self):
+    async def _check_assistant_config(self):
         """Verify assistant configuration"""
         try:
-            assistant = self.client.beta.assistants.retrieve(Settings.ASSISTANT_ID)
+            assistant = await self.client.beta.assistants.retrieve(Settings.ASSISTANT_ID)
             logger.info(f"Assistant Configuration:")
             logger.info(f"Name: {assistant.name}")
             logger.info(f"Model: {assistant.model}")
@@ -97,21 +98,37 @@ class GigaChengGroupBot:
         except Exception as e:
             logger.error(f"Error handling message: {str(e)}")
 
-    async def _daily_summary_task(self):
-        """Generate daily summary at end of day"""
+    async def _on_startup(self, application: Application):
+        """Check the assistant once the event loop the client runs on is up"""
+        await self._check_assistant_config()
+
+    async def _on_shutdown(self, application: Application):
+        """Flush pending analysis logs and close connections before the loop stops"""
         try:
-            summary = self.analysis_logger.generate_daily_summary()
-            self.analysis_logger.log_aggregate_stats({
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'summary': summary
-            })
+            await self.analysis_logger.aclose()
         except Exception as e:
-            logger.error(f"Error generating daily summary: {str(e)}")
+            logger.error(f"Error closing analysis logger: {str(e)}")
+        
+        try:
+            await self.response_handler.aclose()
+        except Exception as e:
+            logger.error(f"Error closing response handler: {str(e)}")
+        
+        try:
+            await close_openai_client()
+        except Exception as e:
+            logger.error(f"Error closing OpenAI client: {str(e)}")
 
     def run(self):
         """Run the bot"""
         try:
-            application = Application.builder().token(Settings.TELEGRAM_BOT_TOKEN).build()
+            application = (
+                Application.builder()
+                .token(Settings.TELEGRAM_BOT_TOKEN)
+                .post_init(self._on_startup)
+                .post_shutdown(self._on_shutdown)
+                .build()
+            )
             
             application.add_handler(MessageHandler(
                 filters.ChatType.GROUPS & filters.TEXT & ~filters.COMMAND, 
@@ -126,6 +143,8 @@ class GigaChengGroupBot:
 
 if __name__ == '__main__':
     try:
+        Settings.validate_env_vars()
+        write_env_cache()
         bot = GigaChengGroupBot()
         bot.run()
     except Exception as e:
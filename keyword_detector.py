@@ -1,4 +1,6 @@
-from typing import List, Set
+import re
+import sys
+from typing import List, Tuple
 from message import Message
 from settings import Settings
 
@@ -7,24 +9,40 @@ class KeywordDetector:
         # Load keywords from settings
         self.technical_keywords = set(Settings.TECHNICAL_KEYWORDS)
         self.emoji_triggers = set(Settings.EMOJI_TRIGGERS)
-    
-    def detect_keywords(self, message: Message) -> Set[str]:
-        """Detect keywords in message"""
-        # Convert message to lowercase and split into words
-        words = set(message.content.lower().split())
         
-        # Find intersection with our technical keywords
-        detected_keywords = words.intersection(self.technical_keywords)
+        # Multi-word keywords never survive split(), so match them as phrases
+        # with a single compiled pattern over the lowercased text
+        phrases = sorted(
+            (k for k in self.technical_keywords if ' ' in k),
+            key=len, reverse=True
+        )
+        self._phrase_re = re.compile(r'\b(?:' + '|'.join(
+            r'\s+'.join(map(re.escape, phrase.split())) for phrase in phrases
+        ) + r')\b') if phrases else None
+        
+        # Character class over all emoji triggers, scanned in C
+        self._emoji_re = Settings.EMOJI_RE if self.emoji_triggers else None
+    
+    def detect_keywords(self, message: Message) -> Tuple[str, ...]:
+        """Detect keywords in message, returned as a sorted tuple of interned strings"""
+        # Find intersection of the message's lowercase words with our technical keywords
+        detected_keywords = self.technical_keywords.intersection(message.words)
         
-        # Detect emojis
-        emojis = set([char for char in message.content if char in self.emoji_triggers])
+        # Detect multi-word keywords, normalizing whitespace back to the keyword
+        if self._phrase_re:
+            detected_keywords.update(
+                ' '.join(match.split())
+                for match in self._phrase_re.findall(message.content_lower)
+            )
         
-        # Combine both sets
-        detected_keywords.update(emojis)
+        # Detect emojis and combine both sets
+        if self._emoji_re:
+            detected_keywords.update(self._emoji_re.findall(message.content))
         
-        return detected_keywords
+        # Map onto the interned Settings strings so downstream dicts compare by identity
+        return tuple(sorted(map(sys.intern, detected_keywords)))
     
-    def has_important_keywords(self, keywords: Set[str]) -> bool:
+    def has_important_keywords(self, keywords: Tuple[str, ...]) -> bool:
         """Check if detected keywords are important enough to trigger a response"""
         # For now, any keyword is considered important
         return bool(keywords)
\ No newline at end of file
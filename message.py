@@ -1,8 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, FrozenSet, Tuple
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     id: str
     content: str
@@ -10,8 +10,18 @@ class Message:
     timestamp: datetime
     sentiment_score: float = 0.0
     sentiment_subjectivity: float = 0.0
-    keywords: List[str] = field(default_factory=list)
+    keywords: Tuple[str, ...] = ()
     context_id: Optional[str] = None
+    # Full sentiment analysis, kept so later stages need not re-run it
+    sentiment_details: Dict = field(default_factory=dict, repr=False, compare=False)
+    
+    # Derived once per message and shared by all detectors
+    content_lower: str = field(init=False, repr=False, compare=False)
+    words: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.content_lower = self.content.lower()
+        self.words = frozenset(self.content_lower.split())
     
     def to_dict(self) -> Dict:
         return {
@@ -21,6 +31,14 @@ class Message:
             'timestamp': self.timestamp.isoformat(),
             'sentiment_score': self.sentiment_score,
             'sentiment_subjectivity': self.sentiment_subjectivity,
-            'keywords': self.keywords,
+            'keywords': list(self.keywords),
             'context_id': self.context_id
-        }
\ No newline at end of file
+        }
+
+@dataclass(slots=True)
+class MessageFeatures:
+    """Analysis results computed once per message by the decision engine"""
+    sentiment: Dict
+    keywords: Tuple[str, ...]
+    has_project_mention: bool
+    is_question: bool
@@ -1,5 +1,7 @@
 # message_processor.py
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import asyncio
 import logging
 from typing import Tuple, Dict
 from message import Message
@@ -16,39 +18,61 @@ class MessageProcessor:
         self.decision_engine = decision_engine
         self.response_handler = response_handler
         self.analysis_logger = analysis_logger
+        # Analysis is CPU-bound; one worker keeps it off the event loop while
+        # still applying messages to the shared context tracker in order
+        self._analysis_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="analysis"
+        )
+
+    def _analyze(self, message: Message, is_reply_to_bot: bool) -> Tuple[bool, Dict, Dict, Dict]:
+        """Run the decision engine and snapshot its results for one message"""
+        should_respond, debug_info = self.decision_engine.process_message(
+            message, 
+            is_reply_to_bot=is_reply_to_bot
+        )
+        context_summary = self.decision_engine.context_tracker.get_context_summary()
+        # Reuse the engine's analysis; only re-run it if the engine bailed out early
+        sentiment_details = (message.sentiment_details or
+                             self.decision_engine.sentiment_analyzer.analyze(message))
+        return should_respond, debug_info, context_summary, sentiment_details
 
     async def process_message(self, chat_id: int, message: Message, 
                             username: str, is_reply_to_bot: bool = False) -> Tuple[bool, str]:
         """Process a message and return response if needed"""
         try:
-            logger.info(f"""
+            logger.info("""
 Received message:
-Chat ID: {chat_id}
-User: {username}
-Message Preview: {message.content[:50]}...
-Timestamp: {datetime.now()}
-            """)
+Chat ID: %s
+User: %s
+Message Preview: %.50s...
+Timestamp: %s
+            """, chat_id, username, message.content, datetime.now())
 
             if not is_reply_to_bot and not await self.response_handler._check_rate_limit(chat_id):
-                logger.info(f"Skipping response due to rate limit for chat {chat_id}")
+                logger.info("Skipping response due to rate limit for chat %s", chat_id)
                 return False, None
 
-            should_respond, debug_info = self.decision_engine.process_message(
-                message, 
-                is_reply_to_bot=is_reply_to_bot
+            loop = asyncio.get_running_loop()
+            should_respond, debug_info, context_summary, sentiment_details = (
+                await loop.run_in_executor(
+                    self._analysis_executor, self._analyze, message, is_reply_to_bot
+                )
             )
 
-            context_summary = self.decision_engine.context_tracker.get_context_summary()
-            sentiment_details = self.decision_engine.sentiment_analyzer.analyze(message)
-
-            logger.info(f"""
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("""
 Message Analysis Results:
-Decision: {'Will Respond' if should_respond or is_reply_to_bot else 'No Response'}
-Sentiment Score: {sentiment_details.get('polarity', 0):.2f}
-Keywords Detected: {', '.join(message.keywords) if message.keywords else 'None'}
-Is Reply to Bot: {is_reply_to_bot}
-Debug Info: {debug_info}
-            """)
+Decision: %s
+Sentiment Score: %.2f
+Keywords Detected: %s
+Is Reply to Bot: %s
+Debug Info: %s
+            """,
+                    'Will Respond' if should_respond or is_reply_to_bot else 'No Response',
+                    sentiment_details.get('polarity', 0),
+                    ', '.join(message.keywords) if message.keywords else 'None',
+                    is_reply_to_bot,
+                    debug_info)
 
             bot_response = None
             if should_respond or is_reply_to_bot:
@@ -57,10 +81,11 @@ Debug Info: {debug_info}
                     message,
                     sentiment_details,
                     username,
-                    is_reply_to_bot
+                    is_reply_to_bot,
+                    context_summary=context_summary
                 )
                 
-                self.response_handler.last_response_times[chat_id] = datetime.now()
+                self.response_handler.record_response(chat_id)
 
             self.analysis_logger.log_analysis(
                 chat_id=chat_id,
@@ -0,0 +1,48 @@
+# openai_client.py
+import logging
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI
+from settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Building an SSL context loads the whole CA bundle, so do it once per process
+SHARED_SSL_CONTEXT = httpx.create_ssl_context()
+
+_client: Optional[AsyncOpenAI] = None
+
+def get_openai_client() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        # One keep-alive HTTP/2 connection pool shared by every Assistants call
+        http_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=1,
+                verify=SHARED_SSL_CONTEXT,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=30
+                )
+            ),
+            timeout=30.0
+        )
+
+        # OpenAI client with v2 Assistants API configuration
+        _client = AsyncOpenAI(
+            api_key=Settings.OPENAI_API_KEY,
+            http_client=http_client,
+            default_headers={"OpenAI-Beta": "assistants=v2"}
+        )
+        logger.info("Created shared OpenAI client")
+    return _client
+
+async def close_openai_client() -> None:
+    """Close the shared client's connection pool"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
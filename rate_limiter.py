@@ -0,0 +1,51 @@
+# rate_limiter.py
+import asyncio
+import time
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def has_tokens(self, n: float = 1) -> bool:
+        """Check whether n tokens are available without taking them"""
+        self._refill()
+        return self.tokens >= n
+
+    def try_acquire(self, n: float = 1) -> bool:
+        """Take n tokens if they are available"""
+        self._refill()
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
+
+    def consume(self, n: float = 1) -> None:
+        """Take n tokens unconditionally, e.g. for work that bypassed the check"""
+        self._refill()
+        self.tokens = max(self.tokens - n, 0.0)
+
+    def wait_time(self, n: float = 1) -> float:
+        """Seconds until n tokens will be available"""
+        self._refill()
+        if self.tokens >= n:
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+class AsyncTokenBucket(TokenBucket):
+    """Token bucket whose acquire waits for tokens instead of refusing"""
+
+    async def acquire(self, n: float = 1) -> None:
+        """Sleep until n tokens are available, then take them"""
+        while not self.try_acquire(n):
+            await asyncio.sleep(self.wait_time(n))
@@ -1,17 +1,17 @@
 #!/usr/bin/env python3
 import os
-import json
+import orjson
 import logging
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 from pathlib import Path
-from openai import OpenAI
-from typing import Dict, List
+from typing import Dict, List, Optional
 import asyncio
 
 # Import local modules
-from settings import Settings
-from response_handler import ResponseHandler
-from decision_engine import DecisionEngine
+from settings import Settings, write_env_cache
+from thread_store import ThreadStore
+from openai_client import get_openai_client, close_openai_client
 
 # Setup logging
 logging.basicConfig(
@@ -20,16 +20,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Thread creations in flight at once during a reset
+RESET_CONCURRENCY = 16
+
+# Days of analysis logs searched for chats missing from the thread snapshot
+LOG_SCAN_DAYS = 30
+
+# Top-level chat id in an analysis log line, as written by orjson or json
+CHAT_ID_RE = re.compile(rb'"chat_id": ?(-?\d+)')
+
 class ThreadResetter:
     def __init__(self):
         """Initialize the thread resetter with required components"""
         try:
             # Initialize OpenAI client
-            self.client = OpenAI(api_key=Settings.OPENAI_API_KEY)
-            
-            # Initialize bot components
-            self.decision_engine = DecisionEngine()
-            self.response_handler = ResponseHandler(self.client, self.decision_engine)
+            self.client = get_openai_client()
             
             # Setup backup directory
             self.backup_dir = Path("thread_backups")
@@ -42,32 +47,46 @@ class ThreadResetter:
             logger.error(f"Failed to initialize ThreadResetter: {str(e)}")
             raise
 
+    @staticmethod
+    def _read_chat_id(line: bytes) -> Optional[int]:
+        """Pull the chat id out of one analysis log line, as ThreadStore keys it"""
+        # chat_id is the second key of every entry (after the timestamp), so the
+        # first match is the top-level one and the line needs no full parse
+        match = CHAT_ID_RE.search(line)
+        if match:
+            return int(match.group(1))
+        if b'"chat_id"' not in line:
+            return None
+        try:
+            return int(orjson.loads(line)['chat_id'])
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
     def find_existing_threads(self) -> Dict:
         """Find all existing threads"""
         threads = {}
         try:
-            # Check for persistent thread file
-            thread_file = Path("thread_ids.json")
-            if thread_file.exists():
-                with open(thread_file, 'r') as f:
-                    threads = json.load(f)
-                logger.info(f"Found {len(threads)} threads in thread_ids.json")
+            # Check the persistent thread store (snapshot plus append log)
+            store = ThreadStore()
+            threads = dict(store.thread_ids)
+            store.close()
+            logger.info(f"Found {len(threads)} threads in {store.snapshot_file}")
 
             # Check analysis logs as backup
             logs_dir = Path("analysis_logs")
             if logs_dir.exists():
-                today = datetime.now().strftime("%Y-%m-%d")
-                today_log = logs_dir / today / "analysis.jsonl"
-                if today_log.exists():
-                    with open(today_log, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            try:
-                                data = json.loads(line)
-                                chat_id = str(data.get('chat_id'))
-                                if chat_id and chat_id not in threads:
-                                    threads[chat_id] = None
-                            except json.JSONDecodeError:
-                                continue
+                # Day directories are named YYYY-MM-DD, so they compare as strings
+                cutoff = (datetime.now() - timedelta(days=LOG_SCAN_DAYS)).strftime("%Y-%m-%d")
+                logged_chats = set()
+                for day_log in sorted(logs_dir.glob("*/analysis.jsonl")):
+                    if day_log.parent.name < cutoff:
+                        continue
+                    # Stream each file; only the set of chat ids is kept
+                    with open(day_log, 'rb', buffering=1 << 20) as f:
+                        logged_chats.update(map(self._read_chat_id, f))
+                logged_chats.discard(None)
+                # Chats without a known thread get None
+                threads.update(dict.fromkeys(logged_chats - threads.keys()))
 
             logger.info(f"Total threads found: {len(threads)}")
             return threads
@@ -89,8 +108,9 @@ class ThreadResetter:
             }
             
             # Save backup
-            with open(backup_file, 'w') as f:
-                json.dump(thread_data, f, indent=2)
+            with open(backup_file, 'wb') as f:
+                f.write(orjson.dumps(thread_data,
+                                     option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2))
             
             logger.info(f"Thread backup saved to {backup_file}")
             return thread_data
@@ -114,33 +134,44 @@ class ThreadResetter:
             # Backup current threads
             self.backup_current_threads(existing_threads)
             
-            # Create new threads
+            # Create new threads concurrently, bounded so we stay under API limits
+            semaphore = asyncio.Semaphore(RESET_CONCURRENCY)
+            
+            async def create_thread(chat_id):
+                async with semaphore:
+                    return await self.client.beta.threads.create()
+            
+            chat_ids = list(existing_threads.keys())
+            created = await asyncio.gather(
+                *(create_thread(chat_id) for chat_id in chat_ids),
+                return_exceptions=True
+            )
+            
             new_threads = {}
-            for chat_id in existing_threads.keys():
-                try:
-                    # Create new thread
-                    new_thread = self.client.beta.threads.create()
-                    new_threads[chat_id] = new_thread.id
-                    
-                    logger.info(f"Reset thread for chat {chat_id}: New thread ID: {new_thread.id}")
-                    results['success'].append({
-                        'chat_id': chat_id,
-                        'old_thread': existing_threads.get(chat_id, 'Unknown'),
-                        'new_thread': new_thread.id
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Failed to reset thread for chat {chat_id}: {str(e)}")
+            for chat_id, new_thread in zip(chat_ids, created):
+                if isinstance(new_thread, Exception):
+                    logger.error(f"Failed to reset thread for chat {chat_id}: {str(new_thread)}")
                     results['failed'].append({
                         'chat_id': chat_id,
-                        'error': str(e)
+                        'error': str(new_thread)
                     })
+                    continue
+                
+                new_threads[chat_id] = new_thread.id
+                logger.info(f"Reset thread for chat {chat_id}: New thread ID: {new_thread.id}")
+                results['success'].append({
+                    'chat_id': chat_id,
+                    'old_thread': existing_threads.get(chat_id, 'Unknown'),
+                    'new_thread': new_thread.id
+                })
             
             # Save new threads to file
             if results['success']:
-                with open('thread_ids.json', 'w') as f:
-                    json.dump(new_threads, f, indent=2)
-                logger.info("Saved new thread mappings to thread_ids.json")
+                # Rewrites the snapshot and empties the log the bot replays over it
+                store = ThreadStore()
+                store.replace_all(new_threads)
+                store.close()
+                logger.info(f"Saved new thread mappings to {store.snapshot_file}")
             
             return results
             
@@ -174,6 +205,9 @@ def print_results(results: Dict[str, List]):
 
 async def main():
     try:
+        Settings.validate_env_vars(Settings.OPENAI_ENV_VARS)
+        write_env_cache()
+        
         # Initialize resetter
         resetter = ThreadResetter()
         
@@ -207,6 +241,8 @@ async def main():
     except Exception as e:
         logger.error(f"Error in main: {str(e)}")
         print(f"\nError: {str(e)}")
+    finally:
+        await close_openai_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,91 @@
+# response_cache.py
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+from settings import Settings
+
+class ResponseCache:
+    """SQLite-backed cache of cleaned assistant responses keyed by prompt hash
+
+    A hit is served without posting the message to the chat's assistant
+    thread, so the thread no longer mirrors the chat. That is why the cache
+    is opt-in (RESPONSE_CACHE_MODE) and meant for replays and testing.
+
+    Modes:
+        enabled  - read hits and store new responses
+        readonly - read hits but never store
+        replay   - only serve hits; a miss is an error instead of an API call
+        disabled - bypass the cache entirely
+    """
+
+    MODES = ('enabled', 'readonly', 'replay', 'disabled')
+
+    def __init__(self, db_file: Optional[str] = None, mode: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None):
+        settings = Settings.RESPONSE_CACHE_SETTINGS
+        self.mode = (mode or settings.MODE).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown response cache mode: {self.mode}")
+        self.ttl_seconds = settings.TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.mode != 'disabled':
+            self._conn = sqlite3.connect(db_file or settings.DB_FILE,
+                                         check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            if self.ttl_seconds:
+                # Drop entries that expired while the bot was down
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                   (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether lookups are made at all"""
+        return self.mode != 'disabled'
+
+    @staticmethod
+    def make_key(prompt: str, assistant_id: str, chat_id: int) -> str:
+        """Hash the exact prompt with the assistant and chat it was answered for"""
+        return hashlib.sha256(f"{chat_id}|{assistant_id}|{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response that is still within its TTL"""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+            return None
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        """Store a response unless the cache is read-only"""
+        if self._conn is None or self.mode != 'enabled':
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
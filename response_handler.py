@@ -1,59 +1,124 @@
 # response_handler.py
-from typing import Dict, Tuple
-from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import DefaultDict, Dict, Optional, Tuple
 import asyncio
 import logging
+import random
 import re
-from openai import OpenAI
+from openai import AsyncOpenAI, NotFoundError
 from message import Message
 from settings import Settings
 from decision_engine import DecisionEngine
+from thread_store import ThreadStore
+from response_cache import ResponseCache
+from rate_limiter import TokenBucket, AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 
 class ResponseHandler:
-    def __init__(self, client: OpenAI, decision_engine: DecisionEngine):
+    # Compiled once; applied in order since each step can expose the next
+    _CITATION_RE = re.compile(r'【\d+:\d+†[^】]+】')
+    _BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+    _NUMBERED_RE = re.compile(r'\d\.\s+')
+
+    def __init__(self, client: AsyncOpenAI, decision_engine: DecisionEngine):
         self.client = client
         self.decision_engine = decision_engine
-        self.thread_ids = {}
-        self.last_response_times = {}
+        # Persisted so chats keep their assistant threads across restarts
+        self.thread_store = ThreadStore()
+        self.thread_ids = self.thread_store.thread_ids
+        self._compaction_task: Optional[asyncio.Task] = None
+        self.response_cache = ResponseCache()
+        # Per-chat response budget: MIN_RESPONSE_INTERVAL on average, with bursts
+        self._response_buckets: Dict[int, TokenBucket] = {}
+        self._chat_locks: DefaultDict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Pace outbound requests below the account's limits instead of
+        # leaning on 429 retries; runs (incl. status polls) and thread/message
+        # calls are limited separately
+        limits = Settings.RATE_LIMITS
+        self._run_bucket = AsyncTokenBucket(
+            rate=limits.OPENAI_REQUESTS_PER_SECOND, capacity=limits.OPENAI_REQUEST_BURST
+        )
+        self._thread_bucket = AsyncTokenBucket(
+            rate=limits.OPENAI_REQUESTS_PER_SECOND, capacity=limits.OPENAI_REQUEST_BURST
+        )
 
     def clean_response(self, text: str) -> str:
         """Clean up response text by removing reference notations and formatting"""
-        cleaned = re.sub(r'【\d+:\d+†[^】]+】', '', text)
-        cleaned = re.sub(r'\*\*([^*]+)\*\*', r'\1', cleaned)  # Remove bold formatting
-        cleaned = re.sub(r'\d\.\s+', '', cleaned)  # Remove numbered lists
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-        return cleaned.strip()
+        cleaned = self._CITATION_RE.sub('', text)
+        cleaned = self._BOLD_RE.sub(r'\1', cleaned)  # Remove bold formatting
+        cleaned = self._NUMBERED_RE.sub('', cleaned)  # Remove numbered lists
+        # Collapse whitespace runs and trim in one C-level split
+        return ' '.join(cleaned.split())
+
+    def _response_bucket(self, chat_id: int) -> TokenBucket:
+        """Get or create the response token bucket for a chat"""
+        bucket = self._response_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._response_buckets[chat_id] = TokenBucket(
+                rate=1 / Settings.RATE_LIMITS.MIN_RESPONSE_INTERVAL,
+                capacity=Settings.RATE_LIMITS.RESPONSE_BURST
+            )
+        return bucket
 
     async def _check_rate_limit(self, chat_id: int) -> bool:
         """Check if we should rate limit responses for this chat"""
-        current_time = datetime.now()
-        if chat_id in self.last_response_times:
-            time_since_last = (current_time - self.last_response_times[chat_id]).seconds
-            if time_since_last < Settings.RATE_LIMITS['MIN_RESPONSE_INTERVAL']:
-                logger.info(f"Rate limited chat {chat_id}: {time_since_last}s since last response")
-                return False
+        bucket = self._response_bucket(chat_id)
+        if not bucket.has_tokens():
+            logger.info(f"Rate limited chat {chat_id}: next response in {bucket.wait_time():.0f}s")
+            return False
         return True
 
-    async def _get_or_create_thread(self, chat_id: int):
+    def record_response(self, chat_id: int) -> None:
+        """Charge a sent response against the chat's budget"""
+        self._response_bucket(chat_id).consume()
+
+    async def _get_or_create_thread(self, chat_id: int, recreate: bool = False):
         """Get existing thread or create new one for the chat"""
         try:
-            if chat_id not in self.thread_ids:
-                thread = self.client.beta.threads.create()
-                self.thread_ids[chat_id] = thread.id
+            if recreate or chat_id not in self.thread_ids:
+                await self._thread_bucket.acquire()
+                thread = await self.client.beta.threads.create()
+                await asyncio.to_thread(self.thread_store.set, chat_id, thread.id)
+                if self.thread_store.needs_compaction:
+                    self._schedule_compaction()
                 logger.info(f"Created new thread for chat {chat_id}")
             return self.thread_ids[chat_id]
         except Exception as e:
             logger.error(f"Error creating/getting thread: {str(e)}")
             raise
 
+    def _schedule_compaction(self) -> None:
+        """Fold the thread log into its snapshot shortly, once per burst"""
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self._compact_thread_store())
+
+    async def _compact_thread_store(self) -> None:
+        """Wait out a burst of new chats, then rewrite the snapshot off the loop"""
+        try:
+            await asyncio.sleep(Settings.THREAD_STORE_SETTINGS.COMPACT_DELAY_SECONDS)
+            await asyncio.to_thread(self.thread_store.compact)
+        except Exception as e:
+            logger.error(f"Error compacting thread store: {str(e)}")
+
+    async def aclose(self) -> None:
+        """Close the thread store and the response cache"""
+        if self._compaction_task is not None:
+            self._compaction_task.cancel()
+            self._compaction_task = None
+        await asyncio.to_thread(self.thread_store.close)
+        self.response_cache.close()
+
     def _format_message_with_context(self, message: Message, sentiment_details: dict, 
-                                   username: str, is_reply: bool = False) -> str:
+                                   username: str, is_reply: bool = False,
+                                   context_summary: Optional[Dict] = None) -> str:
         """Format message with sentiment context"""
         reply_context = "This is a reply to your previous message. " if is_reply else ""
         
-        chat_context = self.decision_engine.context_tracker.get_context_summary()
+        chat_context = context_summary
+        if chat_context is None:
+            chat_context = self.decision_engine.context_tracker.get_context_summary()
+        topics = ', '.join(topic for topic, _ in chat_context.get('top_topics', ()))
         
         context = f"""[Message Analysis:
 Sender: {username}
@@ -63,44 +128,87 @@ Score: {sentiment_details.get('polarity', 0):.2f}
 Subjectivity: {sentiment_details.get('subjectivity', 0):.2f}
 Keywords: {', '.join(message.keywords) if message.keywords else 'None'}
 Current Chat Context: {chat_context.get('current_context', 'None')}
-Active Discussion Topics: {', '.join([topic[0] for topic in chat_context.get('top_topics', [])])}]
+Active Discussion Topics: {topics}]
 
 {reply_context}Message: {message.content}"""
         return context
 
     async def get_assistant_response(self, chat_id: int, message: Message, 
                                    sentiment_details: dict, username: str, 
-                                   is_reply: bool = False) -> str:
+                                   is_reply: bool = False,
+                                   context_summary: Optional[Dict] = None) -> str:
+        """Get response from OpenAI assistant, one run per chat at a time"""
+        # A thread allows only one active run, so later messages in the same
+        # chat wait for the current run instead of failing against it
+        async with self._chat_locks[chat_id]:
+            return await self._request_response(
+                chat_id, message, sentiment_details, username, is_reply, context_summary
+            )
+
+    async def _request_response(self, chat_id: int, message: Message,
+                                sentiment_details: dict, username: str,
+                                is_reply: bool = False,
+                                context_summary: Optional[Dict] = None) -> str:
         """Get response from OpenAI assistant using v2 API"""
         try:
+            content = self._format_message_with_context(
+                message, 
+                sentiment_details, 
+                username,
+                is_reply,
+                context_summary
+            )
+            
+            # An identical prompt already answered skips the whole run
+            cache_key = None
+            if self.response_cache.enabled:
+                cache_key = self.response_cache.make_key(content, Settings.ASSISTANT_ID, chat_id)
+                cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+                if cached is not None:
+                    logger.info(f"Serving cached response for chat {chat_id}")
+                    return cached
+                if self.response_cache.mode == 'replay':
+                    raise LookupError(f"No cached response for chat {chat_id} in replay mode")
+            
             thread_id = await self._get_or_create_thread(chat_id)
             
-            # Create message in thread
-            self.client.beta.threads.messages.create(
-                thread_id=thread_id,
-                role="user",
-                content=self._format_message_with_context(
-                    message, 
-                    sentiment_details, 
-                    username,
-                    is_reply
+            # Create message in thread; the cached thread is assumed valid and
+            # only replaced if the API reports it gone (e.g. deleted upstream)
+            try:
+                await self._thread_bucket.acquire()
+                await self.client.beta.threads.messages.create(
+                    thread_id=thread_id,
+                    role="user",
+                    content=content
+                )
+            except NotFoundError:
+                logger.warning(f"Thread {thread_id} for chat {chat_id} not found, recreating")
+                thread_id = await self._get_or_create_thread(chat_id, recreate=True)
+                await self._thread_bucket.acquire()
+                await self.client.beta.threads.messages.create(
+                    thread_id=thread_id,
+                    role="user",
+                    content=content
                 )
-            )
             
             # Create run
-            run = self.client.beta.threads.runs.create(
+            await self._run_bucket.acquire()
+            run = await self.client.beta.threads.runs.create(
                 thread_id=thread_id,
                 assistant_id=Settings.ASSISTANT_ID
             )
             
-            start_time = datetime.now()
-            timeout = timedelta(seconds=30)
+            limits = Settings.RATE_LIMITS
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + limits.RUN_TIMEOUT
+            delay = limits.POLL_INITIAL_DELAY
             
             while True:
-                if datetime.now() - start_time > timeout:
+                if loop.time() > deadline:
                     raise TimeoutError("Assistant response timed out")
                     
-                run_status = self.client.beta.threads.runs.retrieve(
+                await self._run_bucket.acquire()
+                run_status = await self.client.beta.threads.runs.retrieve(
                     thread_id=thread_id,
                     run_id=run.id
                 )
@@ -112,18 +220,25 @@ Active Discussion Topics: {', '.join([topic[0] for topic in chat_context.get('to
                 elif run_status.status == 'requires_action':
                     logger.info(f"Run {run.id} requires action: {run_status.required_action}")
                 
-                await asyncio.sleep(1)
+                # Jitter keeps concurrent chats from polling in lockstep
+                await asyncio.sleep(delay + random.uniform(0, limits.POLL_JITTER))
+                delay = min(delay * limits.POLL_BACKOFF_FACTOR, limits.POLL_MAX_DELAY)
             
-            messages = self.client.beta.threads.messages.list(
+            # Only the message this run produced, however the thread moved meanwhile
+            await self._thread_bucket.acquire()
+            messages = await self.client.beta.threads.messages.list(
                 thread_id=thread_id,
+                run_id=run.id,
                 order="desc",
                 limit=1
             )
             
             for msg in messages.data:
                 if msg.role == "assistant":
-                    response_text = msg.content[0].text.value
-                    return self.clean_response(response_text)
+                    response_text = self.clean_response(msg.content[0].text.value)
+                    if cache_key is not None:
+                        await asyncio.to_thread(self.response_cache.set, cache_key, response_text)
+                    return response_text
             
             raise Exception("No assistant response found")
             
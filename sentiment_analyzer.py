@@ -1,10 +1,31 @@
 import re
+from collections import Counter
+from functools import lru_cache
 from textblob import TextBlob
-from typing import Dict
+from typing import Dict, NamedTuple, Tuple
 from message import Message
 from settings import Settings
 
+class TextFeatures(NamedTuple):
+    """Everything analyze needs that depends only on the message text"""
+    polarity: float
+    subjectivity: float
+    modifiers: Tuple[float, ...]
+    emoji_impact: float
+    is_question: bool
+    has_caps: bool
+
+# Whitespace, foreign-script text and untracked emoji have nothing to score
+_NEUTRAL_FEATURES = TextFeatures(0.0, 0.0, (), 0, False, False)
+
 class SentimentAnalyzer:
+    # Fully capitalized words of two or more letters (shouting)
+    _CAPS_RE = re.compile(r'\b[A-Z]{2,}\b')
+    # Every lexicon entry, modifier term, emoticon and question mark is printable ASCII
+    _ASCII_RE = re.compile(r'[!-~]')
+    # Words that make a message a question even without a '?'
+    _QUESTION_WORDS = frozenset({'wen', 'when', 'what', 'how', 'why'})
+
     def __init__(self):
         # Project Status Terms
         self.status_modifiers = {
@@ -97,58 +118,95 @@ class SentimentAnalyzer:
             '💀': -0.2,
         }
 
+        # Every modifier term in one pass: the lookahead tries each position and
+        # returns the longest term starting there; shorter terms starting at the
+        # same place ("dump" in "dumping") are recovered through the prefix map
+        self._modifier_order = [
+            (term, modifier)
+            for modifier_dict in [self.status_modifiers, self.project_modifiers,
+                                  self.community_modifiers, self.market_modifiers,
+                                  self.criticism_modifiers]
+            for term, modifier in modifier_dict.items()
+        ]
+        terms = sorted({term for term, _ in self._modifier_order}, key=len, reverse=True)
+        self._modifier_re = re.compile(
+            '(?=(' + '|'.join(re.escape(term) for term in terms) + '))'
+        )
+        self._modifier_prefixes = {
+            term: frozenset(other for other in terms if term.startswith(other))
+            for term in terms
+        }
+
+        # All tracked emoji in one alternation so a message is scanned once
+        self._emoji_re = re.compile('|'.join(re.escape(emoji) for emoji in self.emoji_sentiment))
+
         # Multipliers
         self.exclamation_multiplier = 1.05
         self.caps_multiplier = 1.1
         self.emoji_repeat_multiplier = 1.02
         self.question_discount = 0.5  # Reduce sentiment impact for questions
 
+        # Chat text repeats a lot ("gm", "wen moon"); scan each distinct text once
+        self._text_features = lru_cache(maxsize=8192)(self._extract_features)
+
+    def _extract_features(self, text: str) -> TextFeatures:
+        """Run TextBlob and every text scan for one message text"""
+        if not self._ASCII_RE.search(text) and not self._emoji_re.search(text):
+            return _NEUTRAL_FEATURES
+
+        sentiment = TextBlob(text).sentiment
+        text_lower = text.lower()
+
+        # Check each modifier dictionary, keeping their order for the average
+        modifiers = ()
+        matched_terms = set()
+        for longest in self._modifier_re.findall(text_lower):
+            matched_terms |= self._modifier_prefixes[longest]
+        if matched_terms:
+            modifiers = tuple(modifier for term, modifier in self._modifier_order
+                              if term in matched_terms)
+
+        # Count emoji sentiment with reduced impact
+        emoji_impact = 0
+        counts = Counter(self._emoji_re.findall(text))
+        if counts:
+            for emoji, value in self.emoji_sentiment.items():
+                count = counts.get(emoji)
+                if count:
+                    emoji_impact += value * min(count, 2) * 0.3
+
+        return TextFeatures(
+            polarity=sentiment.polarity,
+            subjectivity=sentiment.subjectivity,
+            modifiers=modifiers,
+            emoji_impact=emoji_impact,
+            is_question='?' in text or not self._QUESTION_WORDS.isdisjoint(text_lower.split()),
+            has_caps=text_lower != text and self._CAPS_RE.search(text) is not None
+        )
+
     def analyze(self, message: Message) -> Dict[str, float]:
-        blob = TextBlob(message.content)
-        base_sentiment = blob.sentiment.polarity * 1.2  # Slightly increase base sentiment weight
-        base_subjectivity = blob.sentiment.subjectivity
+        features = self._text_features(message.content)
+        base_sentiment = features.polarity * 1.2  # Slightly increase base sentiment weight
         
         # Initialize sentiment with base
         adjusted_sentiment = base_sentiment
         
-        text_lower = message.content.lower()
-        words = text_lower.split()
-        
-        # Track modifiers
-        all_modifiers = []
-        
-        # Check each modifier dictionary
-        for modifier_dict in [self.status_modifiers, self.project_modifiers, 
-                            self.community_modifiers, self.market_modifiers, 
-                            self.criticism_modifiers]:
-            for term, modifier in modifier_dict.items():
-                if term in text_lower:
-                    all_modifiers.append(modifier)
-        
         # Apply modifiers with diminishing returns
-        if all_modifiers:
+        if features.modifiers:
             # Average the modifiers but maintain sign
-            avg_modifier = sum(all_modifiers) / len(all_modifiers)
+            avg_modifier = sum(features.modifiers) / len(features.modifiers)
             if abs(avg_modifier) > 0.1:  # Only apply if significant
                 adjusted_sentiment = self._adjust_sentiment(adjusted_sentiment, avg_modifier)
         
-        # Count and apply emoji sentiment with reduced impact
-        emoji_impact = 0
-        for emoji, value in self.emoji_sentiment.items():
-            count = message.content.count(emoji)
-            if count > 0:
-                emoji_impact += value * min(count, 2) * 0.3
-        
-        if emoji_impact != 0:
-            adjusted_sentiment = self._adjust_sentiment(adjusted_sentiment, emoji_impact)
+        if features.emoji_impact != 0:
+            adjusted_sentiment = self._adjust_sentiment(adjusted_sentiment, features.emoji_impact)
         
         # Reduce sentiment impact for questions
-        if '?' in message.content or any(word in ['wen', 'when', 'what', 'how', 'why'] for word in words):
+        if features.is_question:
             adjusted_sentiment *= self.question_discount
         
         # Apply caps modifier for emphasis
-        caps_words = re.findall(r'\b[A-Z]{2,}\b', message.content)
-        if caps_words:
+        if features.has_caps:
             adjusted_sentiment *= self.caps_multiplier
         
         # Normalize final sentiment
@@ -156,10 +214,10 @@ class SentimentAnalyzer:
         
         return {
             'polarity': final_sentiment,
-            'subjectivity': base_subjectivity,
+            'subjectivity': features.subjectivity,
             'base_sentiment': base_sentiment,
-            'emoji_impact': emoji_impact,
-            'has_custom_keywords': bool(all_modifiers),
+            'emoji_impact': features.emoji_impact,
+            'has_custom_keywords': bool(features.modifiers),
             'sentiment_category': self._get_sentiment_category(final_sentiment)
         }
 
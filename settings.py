@@ -1,7 +1,11 @@
 ## settings.py
+from dataclasses import dataclass
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Iterable, Optional, Tuple
 import os
+import orjson
+import re
+import sys
 import logging
 
 # Setup logging
@@ -10,30 +14,182 @@ logger = logging.getLogger(__name__)
 # Get the directory containing the settings file
 SETTINGS_DIR = Path(__file__).resolve().parent
 ENV_PATH = SETTINGS_DIR / '.env'
+ENV_CACHE_PATH = SETTINGS_DIR / '.env.cache'
 
-# Load environment variables
-logger.info(f"Loading environment variables from: {ENV_PATH}")
-load_dotenv(dotenv_path=ENV_PATH)
+# Parse waiting to be cached by write_env_cache(); importing settings never writes files
+_uncached_env = None
+
+def _load_env_cached(env_path: Path, cache_path: Path) -> None:
+    """Load .env into os.environ, reusing the last parse while the file is unchanged
+
+    Like load_dotenv, variables already set in the environment win. The cache
+    holds secrets, so it is JSON (never pickle) and readable by the owner only.
+    """
+    global _uncached_env
+    try:
+        stat = env_path.stat()
+    except FileNotFoundError:
+        return
+    stamp = [stat.st_mtime_ns, stat.st_size]
+
+    values = None
+    try:
+        cached = orjson.loads(cache_path.read_bytes())
+        if cached['stamp'] == stamp:
+            values = cached['values']
+    except (OSError, orjson.JSONDecodeError, KeyError, TypeError):
+        pass
+
+    if values is None:
+        from dotenv import dotenv_values
+        values = {key: value for key, value in dotenv_values(env_path).items()
+                  if value is not None}
+        # ${VAR} interpolation depends on the environment at load time
+        if b'${' not in env_path.read_bytes():
+            _uncached_env = {'stamp': stamp, 'values': values}
+
+    for key, value in values.items():
+        os.environ.setdefault(key, value)
+
+def write_env_cache() -> None:
+    """Save the .env parse made at import for the next start; called by entry points"""
+    global _uncached_env
+    if _uncached_env is None:
+        return
+    tmp_path = ENV_CACHE_PATH.with_name(ENV_CACHE_PATH.name + '.tmp')
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(_uncached_env))
+        os.replace(tmp_path, ENV_CACHE_PATH)
+        _uncached_env = None
+    except OSError as e:
+        logger.warning("Could not write environment cache: %s", e)
+
+# Load environment variables (lazy %-formatting: nothing is formatted unless INFO is on)
+logger.info("Loading environment variables from: %s", ENV_PATH)
+_load_env_cached(ENV_PATH, ENV_CACHE_PATH)
+
+def _normalized(terms):
+    """Lowercase and intern configured terms so matching never depends on their case"""
+    return tuple(sys.intern(term.lower()) for term in terms)
+
+class _EnvVar:
+    """Class attribute read from os.environ on first access and then kept
+
+    Reading on access rather than at class creation means the value is
+    whatever the environment holds once .env has been loaded. An unset
+    variable is looked up again next time.
+    """
+    __slots__ = ('name', '_value')
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = None
+
+    def __get__(self, obj, owner=None):
+        if self._value is None:
+            self._value = os.environ.get(self.name)
+        return self._value
+
+# Fixed-shape setting groups: attribute access, and a typo fails at import
+@dataclass(frozen=True, slots=True)
+class _ContextSettings:
+    MAX_CONTEXT_MESSAGES: int
+    CONTEXT_TIMEFRAME_MINUTES: int
+    MIN_MESSAGES_FOR_TREND: int
+    DEAD_CHAT_MINUTES: int
+
+@dataclass(frozen=True, slots=True)
+class _RateLimits:
+    MIN_RESPONSE_INTERVAL: int
+    MAX_DAILY_RESPONSES: int
+    RANDOM_RESPONSE_PROBABILITY: float
+    RESPONSE_BURST: int
+    RUN_TIMEOUT: int
+    POLL_INITIAL_DELAY: float
+    POLL_BACKOFF_FACTOR: float
+    POLL_MAX_DELAY: float
+    POLL_JITTER: float
+    OPENAI_REQUESTS_PER_SECOND: int
+    OPENAI_REQUEST_BURST: int
+
+@dataclass(frozen=True, slots=True)
+class _TelegramSettings:
+    AUTO_RESPOND: bool
+    ALLOWED_CHAT_TYPES: Tuple[str, ...]
+    MAX_MESSAGE_LENGTH: int
+    ALLOWED_CHATS: Tuple[int, ...]
+    ADMIN_USERS: Tuple[int, ...]
+
+@dataclass(frozen=True, slots=True)
+class _ResponsePriorities:
+    MENTIONS: float
+    QUESTIONS: float
+    NEGATIVE_SENTIMENT: float
+    TECHNICAL_DISCUSSION: float
+    PRICE_DISCUSSION: float
+    COMMUNITY: float
+    RANDOM: float
+
+@dataclass(frozen=True, slots=True)
+class _AlertThresholds:
+    NEGATIVE_MESSAGE_STREAK: int
+    SPAM_MESSAGES_PER_MINUTE: int
+    INACTIVE_HOURS: int
+    SENTIMENT_SWING: float
+
+@dataclass(frozen=True, slots=True)
+class _AnalysisLogSettings:
+    FLUSH_MAX_ENTRIES: int
+    FLUSH_MAX_BYTES: int
+    FLUSH_INTERVAL_SECONDS: float
+    QUEUE_MAXSIZE: int
+    OVERFLOW_MAXSIZE: int
+    BUFFER_POOL_SIZE: int
+
+@dataclass(frozen=True, slots=True)
+class _ThreadStoreSettings:
+    SNAPSHOT_FILE: str
+    LOG_FILE: str
+    COMPACT_EVERY: int
+    COMPACT_LOG_RATIO: float
+    COMPACT_DELAY_SECONDS: float
+
+@dataclass(frozen=True, slots=True)
+class _ResponseCacheSettings:
+    MODE: str
+    DB_FILE: str
+    TTL_SECONDS: int
 
 class Settings:
-    # Load API Keys and IDs from environment variables
-    TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-    ASSISTANT_ID = os.getenv('ASSISTANT_ID')
+    """Bot configuration; entry points call validate_env_vars() before using API clients"""
+
+    # API Keys and IDs, read from the environment when first used
+    TELEGRAM_BOT_TOKEN = _EnvVar('TELEGRAM_BOT_TOKEN')
+    OPENAI_API_KEY = _EnvVar('OPENAI_API_KEY')
+    ASSISTANT_ID = _EnvVar('ASSISTANT_ID')
+    # What the OpenAI-only maintenance scripts need; they never reach Telegram
+    OPENAI_ENV_VARS = ('OPENAI_API_KEY', 'ASSISTANT_ID')
+    
+    # Root log level; set LOG_LEVEL=WARNING in production to mute per-message logs
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
     
     # Response Trigger Thresholds
     SENTIMENT_THRESHOLD_RESPONSE = 0.3     
     SENTIMENT_THRESHOLD_ALERT = -0.3     
     
     # Project Terms for Response Triggers
-    PROJECT_TERMS = {
+    PROJECT_TERMS = frozenset(_normalized({
         'gigacheng', 'giga', 'cheng',    # Core project terms
         'alephium', 'alph', 'ayin',      # Ecosystem terms
-        'candyswap', 'chengverse', 'chenginator'
-    }
+        'candyswap', 'chengverse', 'chenginator',
+        'gigachengbot'                   # Bot handle typed without the underscore
+    }))
 
-    # Technical Keywords for Monitoring
-    TECHNICAL_KEYWORDS = [
+    # Technical Keywords for Monitoring (lowercased once, and interned so
+    # detected keywords share one object)
+    TECHNICAL_KEYWORDS = frozenset(_normalized([
         # Project/Token Criticism
         'shitcoin', 'rugpull', 'rug', 'rugged', 'honeypot', 'scam', 'ponzi', 
         'pyramid', 'exit scam', 'dead project', 'ghost chain', 'vaporware',
@@ -57,20 +213,22 @@ class Settings:
         'anon team', 'anonymous devs', 'no docs', 'no whitepaper',
         'no roadmap', 'missed deadline', 'delayed', 'no updates',
         'empty promises'
-    ]
+    ]))
     
     # Emoji Detection
-    EMOJI_TRIGGERS = {
+    EMOJI_TRIGGERS = frozenset(map(sys.intern, {
         # Positive
         '🚀', '📈', '💎', '🔥', '⚡', '🦁', '💪',
         '🤝', '✅', '🎉', '🤑', '👑', '🏆', '❤', '👍',
         
         # Negative
         '📉', '😢', '😭', '💀'
-    }
+    }))
+    # Every trigger is a single code point, so one character class finds them all
+    EMOJI_RE = re.compile('[' + re.escape(''.join(sorted(EMOJI_TRIGGERS))) + ']')
     
     # Question Detection
-    QUESTION_INDICATORS = {
+    QUESTION_INDICATORS = frozenset(_normalized({
         # Direct Questions
         'what', 'how', 'when', 'where', 'why', 'who',
         'which', 'whose', 'whom',
@@ -82,61 +240,102 @@ class Settings:
         'can', 'could', 'would', 'should', 'will',
         'do', 'does', 'did', 'has', 'have',
         'is', 'are', 'was', 'were'
-    }
+    }))
     
     # Context Settings
-    CONTEXT_SETTINGS = {
-        'MAX_CONTEXT_MESSAGES': 50,       # Maximum messages to keep in context
-        'CONTEXT_TIMEFRAME_MINUTES': 30,  # How long to maintain context
-        'MIN_MESSAGES_FOR_TREND': 5,      # Messages needed to establish trend
-        'DEAD_CHAT_MINUTES': 2,          # Time before considering chat "dead"
-    }
+    CONTEXT_SETTINGS = _ContextSettings(
+        MAX_CONTEXT_MESSAGES=50,       # Maximum messages to keep in context
+        CONTEXT_TIMEFRAME_MINUTES=30,  # How long to maintain context
+        MIN_MESSAGES_FOR_TREND=5,      # Messages needed to establish trend
+        DEAD_CHAT_MINUTES=2,           # Time before considering chat "dead"
+    )
     
     # Rate Limiting
-    RATE_LIMITS = {
-        'MIN_RESPONSE_INTERVAL': 15,       
-        'MAX_DAILY_RESPONSES': 100,        
-        'RANDOM_RESPONSE_PROBABILITY': 0.1
-    }
+    RATE_LIMITS = _RateLimits(
+        MIN_RESPONSE_INTERVAL=15,
+        MAX_DAILY_RESPONSES=100,
+        RANDOM_RESPONSE_PROBABILITY=0.1,
+        RESPONSE_BURST=2,                 # Back-to-back responses a quiet chat may get
+        
+        # Assistant run polling: start fast, back off with jitter up to the cap
+        RUN_TIMEOUT=30,                   # Seconds before a run is abandoned
+        POLL_INITIAL_DELAY=0.1,
+        POLL_BACKOFF_FACTOR=1.5,
+        POLL_MAX_DELAY=1.0,
+        POLL_JITTER=0.05,
+        
+        # Outbound OpenAI pacing, per endpoint group (runs / threads+messages)
+        OPENAI_REQUESTS_PER_SECOND=8,
+        OPENAI_REQUEST_BURST=16,
+    )
 
     # Telegram-Specific Settings
-    TELEGRAM_SETTINGS = {
-        'AUTO_RESPOND': True,
-        'ALLOWED_CHAT_TYPES': ['group', 'supergroup'],
-        'MAX_MESSAGE_LENGTH': 4096,       # Telegram message length limit
-        'ALLOWED_CHATS': [],             # Empty list = all chats allowed
-        'ADMIN_USERS': []                # Empty list = no admins
-    }
+    TELEGRAM_SETTINGS = _TelegramSettings(
+        AUTO_RESPOND=True,
+        ALLOWED_CHAT_TYPES=('group', 'supergroup'),
+        MAX_MESSAGE_LENGTH=4096,  # Telegram message length limit
+        ALLOWED_CHATS=(),         # Empty = all chats allowed
+        ADMIN_USERS=()            # Empty = no admins
+    )
     
     # Response Priority Categories
-    RESPONSE_PRIORITIES = {
-        'MENTIONS': 1.0,                 # Direct mentions
-        'QUESTIONS': 0.8,                # Project questions
-        'NEGATIVE_SENTIMENT': 0.7,       # Strong negative sentiment
-        'TECHNICAL_DISCUSSION': 0.6,     # Technical topics
-        'PRICE_DISCUSSION': 0.5,         # Price/market discussion
-        'COMMUNITY': 0.4,                # Community topics
-        'RANDOM': 0.1                    # Random engagement
-    }
+    RESPONSE_PRIORITIES = _ResponsePriorities(
+        MENTIONS=1.0,              # Direct mentions
+        QUESTIONS=0.8,             # Project questions
+        NEGATIVE_SENTIMENT=0.7,    # Strong negative sentiment
+        TECHNICAL_DISCUSSION=0.6,  # Technical topics
+        PRICE_DISCUSSION=0.5,      # Price/market discussion
+        COMMUNITY=0.4,             # Community topics
+        RANDOM=0.1                 # Random engagement
+    )
     
     # Alert Thresholds
-    ALERT_THRESHOLDS = {
-        'NEGATIVE_MESSAGE_STREAK': 3,    # Consecutive negative messages
-        'SPAM_MESSAGES_PER_MINUTE': 10,  # Messages per minute for spam
-        'INACTIVE_HOURS': 24,            # Hours before marking chat inactive
-        'SENTIMENT_SWING': 0.5           # Large sentiment change threshold
-    }
+    ALERT_THRESHOLDS = _AlertThresholds(
+        NEGATIVE_MESSAGE_STREAK=3,    # Consecutive negative messages
+        SPAM_MESSAGES_PER_MINUTE=10,  # Messages per minute for spam
+        INACTIVE_HOURS=24,            # Hours before marking chat inactive
+        SENTIMENT_SWING=0.5           # Large sentiment change threshold
+    )
+
+    # Analysis Log Buffering
+    ANALYSIS_LOG_SETTINGS = _AnalysisLogSettings(
+        FLUSH_MAX_ENTRIES=64,       # Buffered lines before a flush
+        FLUSH_MAX_BYTES=64 * 1024,  # Buffered bytes before a flush
+        FLUSH_INTERVAL_SECONDS=5,   # Max age of buffered lines
+        QUEUE_MAXSIZE=4096,         # Pending lines for the writer task
+        OVERFLOW_MAXSIZE=4096,      # Lines held past a full queue; oldest dropped beyond it
+        BUFFER_POOL_SIZE=8,         # Recycled write-back buffers kept
+    )
+
+    # Chat Thread Persistence
+    THREAD_STORE_SETTINGS = _ThreadStoreSettings(
+        SNAPSHOT_FILE='thread_ids.json',  # Full chat -> thread mapping
+        LOG_FILE='thread_ids.log',        # Assignments since the snapshot
+        COMPACT_EVERY=100,                # Minimum log lines before rewriting the snapshot
+        COMPACT_LOG_RATIO=10,             # ...and the log must reach this multiple of the snapshot size
+        COMPACT_DELAY_SECONDS=1.0,        # Debounce before a due rewrite runs
+    )
+
+    # Assistant Response Cache, opt-in (MODE: enabled, readonly, replay or disabled)
+    RESPONSE_CACHE_SETTINGS = _ResponseCacheSettings(
+        MODE=os.getenv('RESPONSE_CACHE_MODE', 'disabled'),
+        DB_FILE='response_cache.sqlite3',
+        TTL_SECONDS=3600,  # 0 keeps entries forever
+    )
 
     @classmethod
-    def validate_env_vars(cls):
-        """Validate that all required environment variables are set"""
-        required_vars = ['TELEGRAM_BOT_TOKEN', 'OPENAI_API_KEY', 'ASSISTANT_ID']
-        missing_vars = [var for var in required_vars if not getattr(cls, var)]
+    def validate_env_vars(cls, names: Optional[Iterable[str]] = None):
+        """Validate that the required environment variables are set
+
+        names limits the check to a subset (e.g. OPENAI_ENV_VARS); by
+        default every _EnvVar attribute is required.
+        """
+        if names is None:
+            # Derived from the fields, so the full list cannot drift from them
+            names = [name for name, attr in vars(cls).items() if isinstance(attr, _EnvVar)]
+        missing_vars = [name for name in names if not getattr(cls, name)]
         
         if missing_vars:
             error_msg = f"Missing required environment variables: {', '.join(missing_vars)}"
             logger.error(error_msg)
-            raise ValueError(error_msg)
-
-# Validate environment variables when settings are imported
-Settings.validate_env_vars()
\ No newline at end of file
+            raise ValueError(error_msg)
\ No newline at end of file
@@ -0,0 +1,157 @@
+# thread_store.py
+import os
+import logging
+import threading
+import orjson
+from pathlib import Path
+from typing import Dict, Optional
+from settings import Settings
+
+class ThreadStore:
+    """Chat to assistant thread mapping kept as a JSON snapshot plus an append-only log"""
+
+    def __init__(self, snapshot_file: Optional[str] = None, log_file: Optional[str] = None):
+        settings = Settings.THREAD_STORE_SETTINGS
+        self.snapshot_file = Path(snapshot_file or settings.SNAPSHOT_FILE)
+        self.log_file = Path(log_file or settings.LOG_FILE)
+        self.logger = logging.getLogger(__name__)
+
+        self.thread_ids: Dict[int, str] = {}
+        self._pending = 0  # Log lines not yet folded into the snapshot
+        self._log_bytes = 0
+        self._snapshot_bytes = 0
+        self._snapshot_stamp = None  # Identity of the snapshot file last read or written
+        self._superseded = False  # Another process replaced the snapshot; stop compacting
+        # set() and compact() run in worker threads; keep the log and dict in step
+        self._lock = threading.Lock()
+        self._load()
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+        # Start from an empty log so new lines never follow a torn one
+        if self._pending or os.fstat(self._fd).st_size:
+            self.compact()
+
+    def _load(self) -> None:
+        """Read the snapshot, then replay newer assignments from the log"""
+        try:
+            if self.snapshot_file.exists():
+                with open(self.snapshot_file, 'rb') as f:
+                    self._snapshot_stamp = self._stamp(os.fstat(f.fileno()))
+                    data = f.read()
+                self._snapshot_bytes = len(data)
+                snapshot = orjson.loads(data)
+                # JSON object keys are strings; Telegram chat ids are ints
+                self.thread_ids.update((int(chat_id), thread_id)
+                                       for chat_id, thread_id in snapshot.items()
+                                       if thread_id)
+        except Exception as e:
+            self.logger.error(f"Error loading thread snapshot: {str(e)}")
+
+        try:
+            if self.log_file.exists():
+                with open(self.log_file, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = orjson.loads(line)
+                            self.thread_ids[int(entry['chat_id'])] = entry['thread_id']
+                            self._pending += 1
+                        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                            continue  # Torn last line from a crash
+        except Exception as e:
+            self.logger.error(f"Error replaying thread log: {str(e)}")
+
+        self.logger.info(f"Loaded {len(self.thread_ids)} chat threads")
+
+    @staticmethod
+    def _stamp(stat: os.stat_result):
+        """Inode and mtime identify a snapshot version; os.replace changes both"""
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _snapshot_changed(self) -> bool:
+        """Whether another process (e.g. reset_all_threads.py) replaced the snapshot"""
+        try:
+            current = self._stamp(self.snapshot_file.stat())
+        except FileNotFoundError:
+            current = None
+        return current != self._snapshot_stamp
+
+    def get(self, chat_id: int) -> Optional[str]:
+        """Return the thread id for a chat, if one has been assigned"""
+        return self.thread_ids.get(chat_id)
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Whether the log has grown enough, relative to the snapshot, to fold in
+
+        Scaling the threshold with the snapshot keeps rewrite cost proportional
+        to the bytes appended instead of growing with every new chat.
+        """
+        settings = Settings.THREAD_STORE_SETTINGS
+        return (not self._superseded and
+                self._pending >= settings.COMPACT_EVERY and
+                self._log_bytes >= settings.COMPACT_LOG_RATIO * self._snapshot_bytes)
+
+    def set(self, chat_id: int, thread_id: str) -> None:
+        """Record a chat's thread with a single appended log line"""
+        line = orjson.dumps(
+            {'chat_id': chat_id, 'thread_id': thread_id},
+            option=orjson.OPT_APPEND_NEWLINE
+        )
+        with self._lock:
+            self.thread_ids[chat_id] = thread_id
+            os.write(self._fd, line)
+            self._pending += 1
+            self._log_bytes += len(line)
+
+    def compact(self) -> None:
+        """Rewrite the snapshot from memory and truncate the log"""
+        with self._lock:
+            if self._superseded:
+                return
+            if not self._pending and not os.fstat(self._fd).st_size:
+                return  # Snapshot already up to date
+            if self._snapshot_changed():
+                # Our mapping is stale; overwriting would undo the other writer.
+                # The log keeps growing until restart, which folds it in
+                self._superseded = True
+                self.logger.warning(f"{self.snapshot_file} was replaced by another process; "
+                                    f"not compacting until restart")
+                return
+            self._write_snapshot()
+
+    def replace_all(self, thread_ids: Dict[int, str]) -> None:
+        """Swap in a whole new mapping, e.g. after resetting every thread"""
+        with self._lock:
+            self.thread_ids.clear()
+            self.thread_ids.update(thread_ids)
+            self._write_snapshot()
+            self._superseded = False
+
+    def _write_snapshot(self) -> None:
+        """Atomically write the snapshot and empty the log; caller holds the lock"""
+        tmp_file = self.snapshot_file.with_suffix('.tmp')
+        data = orjson.dumps(self.thread_ids,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Replace the snapshot before truncating; replaying a stale log is harmless
+        os.replace(tmp_file, self.snapshot_file)
+        self._snapshot_stamp = self._stamp(self.snapshot_file.stat())
+        os.ftruncate(self._fd, 0)
+        self._pending = 0
+        self._log_bytes = 0
+        self._snapshot_bytes = len(data)
+
+    def close(self) -> None:
+        """Close the log without rewriting the snapshot
+
+        Every assignment is already in the log and the next start folds it in.
+        Compacting here would write this process's mapping over a snapshot
+        that a reset may have replaced while the bot was running.
+        """
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None